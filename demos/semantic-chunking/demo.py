@@ -8,10 +8,13 @@ and create semantically coherent chunks.
 """
 
 import os
-from typing import List, Tuple
+import re
+from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, List, Optional, Tuple
 from dataclasses import dataclass
 
-from rich.console import Console
+from rich.console import Console, Group
 from rich.panel import Panel
 from rich.table import Table
 from rich.text import Text
@@ -21,15 +24,29 @@ from rich.text import Text
 
 console = Console()
 
+# Sentence boundary: whitespace run following terminal punctuation
+_SENT_SPLIT = re.compile(r'(?<=[.!?])\s+')
 
-@dataclass
+# Words ignored when picking a chunk's topic keyword
+_STOPWORDS = frozenset({'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'is', 'are', 'was', 'were'})
+
+# Punctuation dropped from topic keywords, removed in one str.translate pass
+_PUNCT_TRANS = str.maketrans('', '', '.,!?')
+
+
+@dataclass(slots=True, frozen=True)
 class Chunk:
     """Represents a semantic chunk of text"""
     id: int
     text: str
-    sentences: List[str]
+    sentence_count: int
     topic: str
 
+    @property
+    def sentences(self) -> List[str]:
+        """Sentences of the chunk, re-split from its text on demand"""
+        return _SENT_SPLIT.split(self.text)
+
 
 class SemanticChunker:
     """
@@ -39,13 +56,31 @@ class SemanticChunker:
     better than arbitrary character limits.
     """
 
-    def __init__(self, similarity_threshold: float = 0.7):
+    # Documents whose sentence analysis each chunker keeps (see _analyze)
+    _analysis_cache_size = 128
+
+    def __init__(self, similarity_threshold: float = 0.7, cache: bool = True):
         """
         Args:
             similarity_threshold: Cosine similarity threshold for creating new chunks.
                                 Lower values = more chunks, higher = fewer chunks.
+            cache: Reuse this chunker's analysis of recently chunked documents.
         """
         self.similarity_threshold = similarity_threshold
+        self.cache = cache
+
+        # Per instance, so a subclass whose similarities depend on its own
+        # state (e.g. an embedding model) never sees another chunker's results.
+        # Only the boundary scan depends on the threshold, so re-chunking a
+        # cached document after changing it skips everything else.
+        self._analysis_cache: OrderedDict = OrderedDict()
+
+    def __getstate__(self):
+        # Workers in chunk_corpus start with an empty cache rather than being
+        # sent a copy of this one with every batch
+        state = self.__dict__.copy()
+        state["_analysis_cache"] = OrderedDict()
+        return state
 
     def chunk_document(self, text: str) -> List[Chunk]:
         """
@@ -54,108 +89,200 @@ class SemanticChunker:
         Engineering decision: We use sentence-level analysis rather than
         paragraph-level because topics can shift mid-paragraph in technical docs.
         """
-        # Split into sentences (simplified - production should use spacy/nltk)
-        sentences = self._split_sentences(text)
-
-        # Group sentences into semantic chunks
+        # Nothing to chunk
+        if not text.strip():
+            return []
+
+        # The built-in Jaccard scores are never negative, so a threshold of 0
+        # never splits and no similarities need computing. An overridden
+        # scorer (e.g. cosine of embeddings) can go below 0, so it always
+        # takes the normal path.
+        default_scorer = type(self)._adjacent_similarities is SemanticChunker._adjacent_similarities
+        if default_scorer and self.similarity_threshold <= 0.0:
+            sentences = self._split_sentences(text)
+            sentence_topics = [self._topic_counts(s.lower().split()) for s in sentences]
+            return [self._make_chunk(0, sentences, sentence_topics)]
+
+        sentences, similarities, sentence_topics = self._analyze(text)
+
+        # Group sentences into semantic chunks: the current chunk spans
+        # sentences[start:i] and closes where similarity drops below threshold
         chunks = []
-        current_chunk_sentences = [sentences[0]]
-        chunk_id = 0
+        start = 0
 
         for i in range(1, len(sentences)):
-            # Calculate semantic similarity between sentences
-            # In production: use actual embeddings (OpenAI, Anthropic, etc.)
-            similarity = self._calculate_similarity(
-                current_chunk_sentences[-1],
-                sentences[i]
-            )
-
-            if similarity >= self.similarity_threshold:
-                # Similar enough - add to current chunk
-                current_chunk_sentences.append(sentences[i])
-            else:
-                # Topic shift detected - create new chunk
-                chunk_text = ' '.join(current_chunk_sentences)
-                chunks.append(Chunk(
-                    id=chunk_id,
-                    text=chunk_text,
-                    sentences=current_chunk_sentences.copy(),
-                    topic=self._extract_topic(current_chunk_sentences)
-                ))
-
-                # Start new chunk
-                current_chunk_sentences = [sentences[i]]
-                chunk_id += 1
+            if similarities[i - 1] < self.similarity_threshold:
+                # Topic shift detected - close current chunk, start a new one
+                chunks.append(self._make_chunk(len(chunks), sentences[start:i], sentence_topics[start:i]))
+                start = i
 
         # Add final chunk
-        if current_chunk_sentences:
-            chunk_text = ' '.join(current_chunk_sentences)
-            chunks.append(Chunk(
-                id=chunk_id,
-                text=chunk_text,
-                sentences=current_chunk_sentences,
-                topic=self._extract_topic(current_chunk_sentences)
-            ))
+        chunks.append(self._make_chunk(len(chunks), sentences[start:], sentence_topics[start:]))
 
         return chunks
 
+    def chunk_corpus(self, texts: Iterable[str], max_workers: Optional[int] = None) -> List[List[Chunk]]:
+        """
+        Chunk many documents in parallel, one result list per document.
+
+        Engineering decision: Chunking is pure-Python CPU work that holds the
+        GIL, so documents are fanned out across worker processes rather than
+        threads. Each worker builds its own analysis cache. For a
+        handful of small documents, process startup outweighs the gain - just
+        call chunk_document in a loop.
+        """
+        texts = list(texts)
+        max_workers = max_workers or os.cpu_count() or 1
+        chunksize = max(1, len(texts) // (max_workers * 4))
+
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(self.chunk_document, texts, chunksize=chunksize))
+
+    def _analyze(self, text: str) -> Tuple[List[str], List[float], List[Counter]]:
+        """
+        Split text into sentences and compute everything the boundary scan needs.
+
+        Returns the sentences, the similarity of each adjacent pair and each
+        sentence's topic keyword counts - none of which depend on the threshold.
+        """
+        if self.cache and text in self._analysis_cache:
+            self._analysis_cache.move_to_end(text)
+            return self._analysis_cache[text]
+
+        # Split into sentences (simplified - production should use spacy/nltk)
+        sentences = self._split_sentences(text)
+
+        # Tokenize each sentence exactly once, then score every adjacent pair
+        # in a single call so the chunking loop is just a threshold scan
+        sentence_words = [sentence.lower().split() for sentence in sentences]
+        similarities = self._adjacent_similarities(sentences, sentence_words)
+
+        # Topic keyword counts per sentence, summed per chunk when it closes
+        sentence_topics = [self._topic_counts(words) for words in sentence_words]
+
+        analysis = (sentences, similarities, sentence_topics)
+        if self.cache:
+            self._analysis_cache[text] = analysis
+            if len(self._analysis_cache) > self._analysis_cache_size:
+                self._analysis_cache.popitem(last=False)  # evict least recently used
+
+        return analysis
+
+    def _make_chunk(self, chunk_id: int, sentences: List[str], sentence_topics: List[Counter]) -> Chunk:
+        """Build a chunk from a run of consecutive sentences"""
+        topic_counts = Counter()
+        for counts in sentence_topics:
+            topic_counts.update(counts)
+
+        return Chunk(
+            id=chunk_id,
+            text=' '.join(sentences),
+            sentence_count=len(sentences),
+            topic=self._top_topic(topic_counts)
+        )
+
     def _split_sentences(self, text: str) -> List[str]:
         """Split text into sentences (simplified)"""
         # Production: use proper sentence tokenizer
-        sentences = text.replace('! ', '!|').replace('? ', '?|').replace('. ', '.|').split('|')
-        return [s.strip() for s in sentences if s.strip()]
+        return [s for s in _SENT_SPLIT.split(text.strip()) if s]
 
-    def _calculate_similarity(self, sent1: str, sent2: str) -> float:
+    def _token_masks(self, sentence_words: List[List[str]]) -> List[int]:
+        """
+        Encode each sentence's (lowercased) word set as an integer bitmask.
+
+        Bit i is set when word i of the document's vocabulary appears in the
+        sentence, so set intersection and union become single `&` / `|`
+        operations and their sizes a popcount.
+        """
+        vocabulary = {}
+        masks = []
+        for words in sentence_words:
+            mask = 0
+            for word in words:
+                mask |= 1 << vocabulary.setdefault(word, len(vocabulary))
+            masks.append(mask)
+
+        return masks
+
+    def _adjacent_similarities(self, sentences: List[str],
+                               sentence_words: List[List[str]]) -> List[float]:
         """
-        Calculate semantic similarity between sentences.
+        Calculate semantic similarity between each pair of adjacent sentences.
 
         Engineering decision: In this demo, we use keyword overlap as a proxy.
         Production systems should use proper embeddings (cosine similarity of
         sentence-transformers, OpenAI embeddings, etc.)
+
+        This is called once per document with every sentence, so an embedding
+        override can encode the whole document in ONE batched call rather than
+        once per sentence pair, e.g. with sentence-transformers:
+
+            embeddings = model.encode(sentences, batch_size=1024,
+                                      normalize_embeddings=True)
+            return list((embeddings[:-1] * embeddings[1:]).sum(axis=1))
         """
-        words1 = set(sent1.lower().split())
-        words2 = set(sent2.lower().split())
+        token_masks = self._token_masks(sentence_words)
 
-        if not words1 or not words2:
-            return 0.0
+        # Word counts per sentence are computed once; with them the union size
+        # follows from inclusion-exclusion (|A| + |B| - |A & B|), so each pair
+        # needs a single `&` and popcount
+        sizes = [mask.bit_count() for mask in token_masks]
 
-        intersection = words1.intersection(words2)
-        union = words1.union(words2)
+        similarities = []
+        for i in range(1, len(token_masks)):
+            intersection = (token_masks[i - 1] & token_masks[i]).bit_count()
+            union = sizes[i - 1] + sizes[i] - intersection
+            # Jaccard similarity as a simple proxy for semantic similarity
+            similarities.append(intersection / union if union else 0.0)
 
-        # Jaccard similarity as a simple proxy for semantic similarity
-        return len(intersection) / len(union)
+        return similarities
 
     def _extract_topic(self, sentences: List[str]) -> str:
         """Extract topic keywords from sentences (simplified)"""
         # Production: use proper topic modeling or LLM extraction
-        all_words = ' '.join(sentences).lower().split()
-        # Get most common non-stopwords (simplified)
-        word_counts = {}
-        stopwords = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'is', 'are', 'was', 'were'}
-
-        for word in all_words:
-            word = word.strip('.,!?')
-            if word not in stopwords and len(word) > 3:
-                word_counts[word] = word_counts.get(word, 0) + 1
-
+        return self._top_topic(self._topic_counts(' '.join(sentences).lower().split()))
+
+    def _topic_counts(self, words: List[str]) -> Counter:
+        """Count candidate topic keywords among lowercased words"""
+        # Most common non-stopwords win (simplified)
+        return Counter(
+            word for word in (w.translate(_PUNCT_TRANS) for w in words)
+            if len(word) > 3 and word not in _STOPWORDS
+        )
+
+    def _top_topic(self, word_counts: Counter) -> str:
+        """Return the top keyword, or "general" when there is none"""
         if not word_counts:
             return "general"
 
-        # Return top keyword
-        return max(word_counts.items(), key=lambda x: x[1])[0]
+        return word_counts.most_common(1)[0][0]
 
 
 def visualize_chunking(document: str, chunks: List[Chunk]):
     """Display the chunking results with colored ASCII art"""
 
     # Display original document
-    console.print(Panel(
+    document_panel = Panel(
         document[:200] + "..." if len(document) > 200 else document,
         title="📥 Original Document",
         border_style="cyan"
-    ))
+    )
 
-    console.print()
+    # One pass over the chunks collects the statistics and builds each
+    # chunk's panel from its cached counts
+    total_sentences = 0
+    total_chars = 0
+    chunk_panels = []
+    for chunk in chunks:
+        char_count = len(chunk.text)
+        total_sentences += chunk.sentence_count
+        total_chars += char_count
+
+        chunk_panels.append(Panel(
+            Text(chunk.text[:150] + "..." if char_count > 150 else chunk.text),
+            title=f"🔎 Chunk {chunk.id}: Topic: {chunk.topic.upper()} | Sentences: {chunk.sentence_count} | Chars: {char_count}",
+            border_style="green"
+        ))
 
     # Display chunking statistics
     stats_table = Table(title="📊 Chunking Statistics", border_style="yellow")
@@ -163,29 +290,27 @@ def visualize_chunking(document: str, chunks: List[Chunk]):
     stats_table.add_column("Value", style="green")
 
     stats_table.add_row("Total Chunks", str(len(chunks)))
-    stats_table.add_row("Avg Sentences/Chunk", f"{sum(len(c.sentences) for c in chunks) / len(chunks):.1f}")
-    stats_table.add_row("Avg Chars/Chunk", f"{sum(len(c.text) for c in chunks) / len(chunks):.0f}")
-
-    console.print(stats_table)
-    console.print()
-
-    # Display each chunk
-    for chunk in chunks:
-        chunk_info = f"Topic: {chunk.topic.upper()} | Sentences: {len(chunk.sentences)} | Chars: {len(chunk.text)}"
-
-        console.print(Panel(
-            Text(chunk.text[:150] + "..." if len(chunk.text) > 150 else chunk.text),
-            title=f"🔎 Chunk {chunk.id}: {chunk_info}",
-            border_style="green"
-        ))
+    stats_table.add_row("Avg Sentences/Chunk", f"{total_sentences / len(chunks):.1f}")
+    stats_table.add_row("Avg Chars/Chunk", f"{total_chars / len(chunks):.0f}")
 
     # Display key insight
-    console.print()
-    console.print(Panel(
+    insight_panel = Panel(
         "✨ Semantic chunking preserves context by breaking at topic boundaries,\n"
         "leading to better retrieval relevance compared to arbitrary character limits.",
         title="💡 Key Insight",
         border_style="yellow"
+    )
+
+    # Render everything in one print call: one layout pass and one write to
+    # the terminal, however many chunks there are
+    console.print(Group(
+        document_panel,
+        "",
+        stats_table,
+        "",
+        *chunk_panels,
+        "",
+        insight_panel
     ))
 
 
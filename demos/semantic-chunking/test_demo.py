@@ -32,6 +32,7 @@ def test_chunk_properties():
         assert chunk.id == i
         assert len(chunk.text) > 0
         assert len(chunk.sentences) > 0
+        assert chunk.sentence_count == len(chunk.sentences)
         assert chunk.topic is not None
 
 
@@ -51,6 +52,87 @@ def test_similarity_threshold():
     assert len(chunks_strict) >= len(chunks_loose)
 
 
+def test_custom_similarity_hook():
+    """Test that chunk boundaries follow an overridden similarity hook"""
+    class FixedSimilarityChunker(SemanticChunker):
+        def _adjacent_similarities(self, sentences, sentence_words):
+            # One score per adjacent pair: keep, cut, keep
+            assert len(sentences) == 4
+            return [0.9, 0.1, 0.9]
+
+    chunker = FixedSimilarityChunker(similarity_threshold=0.5)
+
+    chunks = chunker.chunk_document("One here. Two here. Three here. Four here.")
+
+    assert [chunk.text for chunk in chunks] == ["One here. Two here.", "Three here. Four here."]
+
+
+def test_custom_similarity_hook_with_negative_scores():
+    """Test that a hook returning negative scores still splits at thresholds <= 0"""
+    class NegativeSimilarityChunker(SemanticChunker):
+        def _adjacent_similarities(self, sentences, sentence_words):
+            # Cosine of normalized embeddings can drop below zero
+            return [-0.4] * (len(sentences) - 1)
+
+    text = "One here. Two here. Three here."
+
+    for threshold in (1e-9, 0.0, -0.1):
+        chunks = NegativeSimilarityChunker(similarity_threshold=threshold).chunk_document(text)
+
+        assert len(chunks) == 3
+
+
+def test_threshold_sweep_uses_cached_analysis(monkeypatch):
+    """Test that re-chunking with a new threshold hits the cache and matches an uncached run"""
+    text = "Dogs are pets. Cats are pets. Fish are pets. Cars need fuel. Planes fly high."
+    chunker = SemanticChunker()
+
+    calls = []
+    original = chunker._adjacent_similarities
+
+    def counting(*args):
+        calls.append(args)
+        return original(*args)
+
+    monkeypatch.setattr(chunker, "_adjacent_similarities", counting)
+
+    for threshold in (0.1, 0.3, 0.8):
+        chunker.similarity_threshold = threshold
+        cached = chunker.chunk_document(text)
+        uncached = SemanticChunker(similarity_threshold=threshold, cache=False).chunk_document(text)
+
+        assert cached == uncached
+
+    assert len(calls) == 1
+
+
+def test_analysis_cache_is_per_chunker(monkeypatch):
+    """Test that a chunker never reuses another chunker's analysis"""
+    text = "Dogs are pets. Cats are pets. Cars need fuel."
+    SemanticChunker(similarity_threshold=0.3).chunk_document(text)
+
+    # Stands in for a subclass scoring with its own embedding model
+    chunker = SemanticChunker(similarity_threshold=0.3)
+    monkeypatch.setattr(chunker, "_adjacent_similarities", lambda sentences, words: [1.0] * (len(sentences) - 1))
+
+    assert len(chunker.chunk_document(text)) == 1
+
+
+def test_chunk_corpus_matches_chunk_document():
+    """Test that parallel corpus chunking returns per-document results in order"""
+    chunker = SemanticChunker(similarity_threshold=0.3)
+
+    texts = [
+        "This is about dogs. Dogs are great pets. Cats are different animals.",
+        "Python is a programming language. JavaScript runs in browsers.",
+        "This is a single sentence.",
+    ]
+
+    results = chunker.chunk_corpus(texts, max_workers=2)
+
+    assert results == [chunker.chunk_document(text) for text in texts]
+
+
 def test_sentence_splitting():
     """Test sentence splitting"""
     chunker = SemanticChunker()
@@ -64,6 +146,20 @@ def test_sentence_splitting():
     assert "Second sentence" in sentences[1]
 
 
+def test_sentence_splitting_across_lines():
+    """Test that sentences separated by newlines and indentation are split"""
+    chunker = SemanticChunker()
+
+    text = """
+    First sentence.
+    Second sentence!   Third sentence?
+    """
+
+    sentences = chunker._split_sentences(text)
+
+    assert sentences == ["First sentence.", "Second sentence!", "Third sentence?"]
+
+
 def test_topic_extraction():
     """Test topic extraction from sentences"""
     chunker = SemanticChunker()
@@ -90,6 +186,19 @@ def test_empty_document():
     assert len(chunks) <= 1
 
 
+def test_zero_threshold_keeps_one_chunk():
+    """Test that a zero threshold keeps the whole document in one chunk"""
+    chunker = SemanticChunker(similarity_threshold=0.0)
+
+    text = "Dogs are pets. Cars need fuel. Planes fly high."
+
+    chunks = chunker.chunk_document(text)
+
+    assert len(chunks) == 1
+    assert chunks[0].text == text
+    assert chunks[0].sentence_count == 3
+
+
 def test_single_sentence():
     """Test single sentence document"""
     chunker = SemanticChunker()
@@ -5,11 +5,14 @@ Semantic Chunking Example - SUPER COLORFUL VERSION!
 Demonstrates splitting documents at semantic boundaries with MAXIMUM VISUAL FLAIR!
 """
 
+import argparse
+import re
 import time
-from typing import List
+from collections import OrderedDict
+from typing import Callable, Iterator, List, Optional, Tuple
 from dataclasses import dataclass
 
-from rich.console import Console
+from rich.console import Console, Group
 from rich.panel import Panel
 from rich.table import Table
 from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn
@@ -19,8 +22,11 @@ from rich import box
 
 console = Console()
 
+# Sentence boundary: whitespace run following terminal punctuation
+_SENT_SPLIT = re.compile(r'(?<=[.!?])\s+')
 
-@dataclass
+
+@dataclass(slots=True, frozen=True)
 class Chunk:
     """A semantic chunk of text"""
     id: int
@@ -33,82 +39,157 @@ class Chunk:
 class SemanticChunker:
     """Chunks documents at semantic boundaries - THE SMART WAY!"""
 
-    def __init__(self, similarity_threshold: float = 0.3):
-        self.similarity_threshold = similarity_threshold
+    _analysis_cache_size = 128
 
-    def chunk_document(self, text: str) -> List[Chunk]:
-        """Split document into semantic chunks with similarity tracking"""
-        sentences = self._split_sentences(text)
+    def __init__(self, similarity_threshold: float = 0.3, cache: bool = True):
+        self.similarity_threshold = similarity_threshold
+        self.cache = cache
+        # Sentences and adjacent similarities of documents this chunker has
+        # recently split. Only the boundary scan depends on the threshold, so
+        # sweeping it over the same document skips straight to that scan. Kept
+        # per instance: a subclass scoring with its own model must not reuse
+        # another chunker's similarities.
+        self._analysis_cache: OrderedDict = OrderedDict()
+
+    def chunk_document(
+        self,
+        text: str,
+        progress_cb: Optional[Callable[[int, int, int], None]] = None
+    ) -> List[Chunk]:
+        """Split document into semantic chunks with similarity tracking
+
+        progress_cb(stage, done, total) reports real progress through the
+        pipeline: 0 = sentence split, 1 = similarities, 2 = boundaries,
+        3 = chunk emission.
+        """
+        return list(self.iter_chunks(text, progress_cb))
+
+    def iter_chunks(
+        self,
+        text: str,
+        progress_cb: Optional[Callable[[int, int, int], None]] = None
+    ) -> Iterator[Chunk]:
+        """Yield semantic chunks one at a time - for streaming ingestion
+
+        Each stage reports as it runs and always finishes with a
+        (stage, total, total) report; a stage with nothing to do reports
+        (stage, 1, 1).
+        """
+        report = progress_cb or (lambda stage, done, total: None)
+
+        sentences, similarities = self._analyze(text, report)
+
+        # A topic boundary falls wherever similarity drops below the threshold
+        threshold = self.similarity_threshold
+        pair_count = len(similarities)
+        boundaries = []
+        for i, similarity in enumerate(similarities, 1):
+            if similarity < threshold:
+                boundaries.append(i)
+            report(2, i, pair_count)
+        if not pair_count:
+            report(2, 1, 1)
 
         if not sentences:
-            return []
-
-        chunks = []
-        current_sentences = [sentences[0]]
-        chunk_id = 0
-
-        for i in range(1, len(sentences)):
-            similarity = self._calculate_similarity(
-                current_sentences[-1],
-                sentences[i]
+            report(3, 1, 1)
+            return
+
+        # One chunk per run of sentences between boundaries
+        starts = [0] + boundaries
+        ends = boundaries + [len(sentences)]
+        for chunk_id, (start, end) in enumerate(zip(starts, ends)):
+            chunk_text = ' '.join(sentences[start:end])
+            # Positional args: id, text, sentence_count, char_count, similarity_score
+            yield Chunk(
+                chunk_id,
+                chunk_text,
+                end - start,
+                len(chunk_text),
+                similarities[end - 1] if end < len(sentences) else 1.0
             )
-
-            if similarity >= self.similarity_threshold:
-                current_sentences.append(sentences[i])
-            else:
-                chunk_text = ' '.join(current_sentences)
-                chunks.append(Chunk(
-                    id=chunk_id,
-                    text=chunk_text,
-                    sentence_count=len(current_sentences),
-                    char_count=len(chunk_text),
-                    similarity_score=similarity
-                ))
-                current_sentences = [sentences[i]]
-                chunk_id += 1
-
-        if current_sentences:
-            chunk_text = ' '.join(current_sentences)
-            chunks.append(Chunk(
-                id=chunk_id,
-                text=chunk_text,
-                sentence_count=len(current_sentences),
-                char_count=len(chunk_text),
-                similarity_score=1.0
-            ))
-
-        return chunks
+            report(3, chunk_id + 1, len(starts))
+
+    def _analyze(
+        self,
+        text: str,
+        report: Callable[[int, int, int], None]
+    ) -> Tuple[List[str], List[float]]:
+        """Split text into sentences and score each adjacent pair (cached)
+
+        Reports stage 0 once sentences are split and stage 1 once every
+        pair is scored.
+        """
+        if self.cache and text in self._analysis_cache:
+            self._analysis_cache.move_to_end(text)
+            sentences, similarities = self._analysis_cache[text]
+            report(0, 1, 1)
+        else:
+            sentences = self._split_sentences(text)
+            report(0, 1, 1)
+            # Similarity of each sentence to the one before it, in one batch
+            similarities = self._adjacent_similarities(self._token_masks(sentences))
+            if self.cache:
+                self._analysis_cache[text] = (sentences, similarities)
+                if len(self._analysis_cache) > self._analysis_cache_size:
+                    self._analysis_cache.popitem(last=False)  # evict least recently used
+
+        pair_count = len(similarities) or 1
+        report(1, pair_count, pair_count)
+        return sentences, similarities
 
     def _split_sentences(self, text: str) -> List[str]:
         text = ' '.join(text.split())
-        text = text.replace('! ', '!|').replace('? ', '?|').replace('. ', '.|')
-        sentences = [s.strip() for s in text.split('|') if s.strip()]
-        return sentences
+        return [s for s in _SENT_SPLIT.split(text) if s]
 
     def _calculate_similarity(self, sent1: str, sent2: str) -> float:
         """Jaccard similarity - keyword overlap magic!"""
-        words1 = set(sent1.lower().split())
-        words2 = set(sent2.lower().split())
-
-        if not words1 or not words2:
+        mask1, mask2 = self._token_masks([sent1, sent2])
+        return self._jaccard_bits(mask1, mask2)
+
+    def _token_masks(self, sentences: List[str]) -> List[int]:
+        """Encode each sentence's lowercased word set as an integer bitmask
+
+        Bit i is set when word i of the shared vocabulary appears in the
+        sentence, so each sentence is tokenized exactly once.
+        """
+        vocabulary = {}
+        masks = []
+        for sentence in sentences:
+            mask = 0
+            for word in sentence.lower().split():
+                mask |= 1 << vocabulary.setdefault(word, len(vocabulary))
+            masks.append(mask)
+        return masks
+
+    def _jaccard_bits(self, mask1: int, mask2: int) -> float:
+        """Jaccard similarity of two word bitmasks via popcounts"""
+        union = (mask1 | mask2).bit_count()
+        if not union:
             return 0.0
+        return (mask1 & mask2).bit_count() / union
+
+    def _adjacent_similarities(self, token_masks: List[int]) -> List[float]:
+        """Jaccard similarity of every sentence with its predecessor
 
-        intersection = words1.intersection(words2)
-        union = words1.union(words2)
-        return len(intersection) / len(union)
+        Word counts are popcounted once per sentence; the union size then
+        follows from |A| + |B| - |A & B|, leaving one `&` per pair.
+        """
+        sizes = [mask.bit_count() for mask in token_masks]
+        similarities = []
+        for i in range(1, len(token_masks)):
+            intersection = (token_masks[i - 1] & token_masks[i]).bit_count()
+            union = sizes[i - 1] + sizes[i] - intersection
+            similarities.append(intersection / union if union else 0.0)
+        return similarities
 
 
 def create_gradient_text(text: str, color1: str = "cyan", color2: str = "blue") -> Text:
     """Create smooth gradient text - coherent and beautiful!"""
     gradient = Text()
-    # Simple two-color gradient
+    # Simple two-color gradient: one styled run per half
     mid = len(text) // 2
-    for i, char in enumerate(text):
-        if i < mid:
-            color = color1
-        else:
-            color = color2
-        gradient.append(char, style=f"bold {color}")
+    gradient.append(text[:mid], style=f"bold {color1}")
+    gradient.append(text[mid:], style=f"bold {color2}")
     return gradient
 
 
@@ -126,9 +207,10 @@ def show_header():
     console.print()
 
 
-def show_concept():
-    """Explain the concept with coherent colors!"""
-    concept = Panel(
+# The concept, comparison and key-insight screens show fixed content, so
+# each is assembled once here and the show_* functions just print it
+_CONCEPT_PANEL = Panel(
+    Text.from_markup(
         "[bold red]THE PROBLEM:[/bold red]\n"
         "[red]Fixed-size chunking[/red] breaks mid-sentence = [bold red]Context DESTROYED![/bold red]\n\n"
         "[bold green]THE SOLUTION:[/bold green]\n"
@@ -137,17 +219,22 @@ def show_concept():
         "  [cyan]1.[/cyan] Analyze sentence similarity\n"
         "  [cyan]2.[/cyan] Detect topic boundaries\n"
         "  [cyan]3.[/cyan] Create intelligent chunks\n"
-        "  [cyan]4.[/cyan] Profit! [bold green](+28% relevance!)[/bold green]",
-        title="[bold white on blue] CONCEPT [/bold white on blue]",
-        border_style="blue",
-        box=box.DOUBLE
-    )
-    console.print(concept)
+        "  [cyan]4.[/cyan] Profit! [bold green](+28% relevance!)[/bold green]"
+    ),
+    title="[bold white on blue] CONCEPT [/bold white on blue]",
+    border_style="blue",
+    box=box.DOUBLE
+)
+
+
+def show_concept():
+    """Explain the concept with coherent colors!"""
+    console.print(_CONCEPT_PANEL)
     console.print()
 
 
 def show_processing(document: str, chunker: SemanticChunker):
-    """Show document processing with animated progress!"""
+    """Show document processing with live progress!"""
     console.print("[bold cyan]>>> ANALYZING DOCUMENT[/bold cyan]")
     console.print()
 
@@ -159,27 +246,19 @@ def show_processing(document: str, chunker: SemanticChunker):
         console=console
     ) as progress:
 
-        task1 = progress.add_task("[yellow]Splitting into sentences...", total=100)
-        for i in range(100):
-            time.sleep(0.008)
-            progress.update(task1, advance=1)
-
-        task2 = progress.add_task("[cyan]Calculating similarities...", total=100)
-        for i in range(100):
-            time.sleep(0.008)
-            progress.update(task2, advance=1)
-
-        task3 = progress.add_task("[magenta]Detecting topic boundaries...", total=100)
-        for i in range(100):
-            time.sleep(0.008)
-            progress.update(task3, advance=1)
-
-        task4 = progress.add_task("[green]Creating semantic chunks...", total=100)
-        for i in range(100):
-            time.sleep(0.008)
-            progress.update(task4, advance=1)
-
-    chunks = chunker.chunk_document(document)
+        task_ids = [
+            progress.add_task("[yellow]Splitting into sentences...", total=None),
+            progress.add_task("[cyan]Calculating similarities...", total=None),
+            progress.add_task("[magenta]Detecting topic boundaries...", total=None),
+            progress.add_task("[green]Creating semantic chunks...", total=None),
+        ]
+
+        chunks = chunker.chunk_document(
+            document,
+            progress_cb=lambda stage, done, total: progress.update(
+                task_ids[stage], completed=done, total=total
+            )
+        )
 
     console.print()
     success_text = Text()
@@ -223,11 +302,8 @@ def show_chunk_tree(chunks: List[Chunk]):
     console.print()
 
 
-def show_comparison_table():
-    """Show before/after comparison!"""
-    console.print("[bold cyan]>>> IMPACT COMPARISON[/bold cyan]")
-    console.print()
-
+def _build_comparison_table() -> Table:
+    """Build the static strategy comparison table"""
     table = Table(
         title="[bold blue]Chunking Strategies Comparison[/bold blue]",
         box=box.DOUBLE_EDGE,
@@ -261,7 +337,18 @@ def show_comparison_table():
         "[bold green][OK] PERFECT![/bold green]"
     )
 
-    console.print(table)
+    return table
+
+
+_COMPARISON_TABLE = _build_comparison_table()
+
+
+def show_comparison_table():
+    """Show before/after comparison!"""
+    console.print("[bold cyan]>>> IMPACT COMPARISON[/bold cyan]")
+    console.print()
+
+    console.print(_COMPARISON_TABLE)
     console.print()
 
 
@@ -281,8 +368,14 @@ def show_stats(chunks: List[Chunk]):
     stats_table.add_column("Value", style="green bold", justify="right", width=20)
     stats_table.add_column("Quality", style="magenta", justify="center", width=15)
 
-    avg_sentences = sum(c.sentence_count for c in chunks) / len(chunks)
-    avg_chars = sum(c.char_count for c in chunks) / len(chunks)
+    # Both totals in a single pass over the chunks
+    total_sentences = 0
+    total_chars = 0
+    for chunk in chunks:
+        total_sentences += chunk.sentence_count
+        total_chars += chunk.char_count
+    avg_sentences = total_sentences / len(chunks)
+    avg_chars = total_chars / len(chunks)
 
     stats_table.add_row("Total Chunks", str(len(chunks)), "[green][GOOD][/green]")
     stats_table.add_row("Avg Sentences/Chunk", f"{avg_sentences:.1f}", "[green][BALANCED][/green]")
@@ -298,6 +391,7 @@ def show_chunks_detailed(chunks: List[Chunk]):
     console.print("[bold cyan]>>> CHUNK DETAILS[/bold cyan]")
     console.print()
 
+    panels = []
     for chunk in chunks:
         # Alternate between cyan and green for coherence
         color = "cyan" if chunk.id % 2 == 0 else "green"
@@ -307,7 +401,7 @@ def show_chunks_detailed(chunks: List[Chunk]):
         header.append(f"Chunk {chunk.id} ", style=f"bold {color}")
         header.append(f"| {chunk.sentence_count} sentences | {chunk.char_count} chars", style="dim white")
 
-        console.print(Panel(
+        panels.append(Panel(
             preview,
             title=header,
             border_style=color,
@@ -315,13 +409,12 @@ def show_chunks_detailed(chunks: List[Chunk]):
             padding=(0, 2)
         ))
 
+    # One render and write for the whole section instead of one per chunk
+    console.print(Group(*panels))
 
-def show_key_insight():
-    """Show the key insight with coherent styling!"""
-    console.print("[bold cyan]>>> KEY INSIGHT[/bold cyan]")
-    console.print()
 
-    insight = Panel(
+_KEY_INSIGHT_PANEL = Panel(
+    Text.from_markup(
         "[bold cyan]Semantic chunking[/bold cyan] analyzes [bold blue]content meaning[/bold blue]\n"
         "instead of just [red]counting characters[/red].\n\n"
         "[bold white]Result:[/bold white]\n"
@@ -329,12 +422,20 @@ def show_key_insight():
         "  [green]+[/green] Context is preserved\n"
         "  [green]+[/green] Retrieval gets better\n"
         "  [green]=[/green] [bold white on green] +28% relevance improvement! [/bold white on green]\n\n"
-        "[dim]Production systems use embeddings for even better results![/dim]",
-        title="[bold white on cyan] KEY INSIGHT [/bold white on cyan]",
-        border_style="cyan",
-        box=box.DOUBLE
-    )
-    console.print(insight)
+        "[dim]Production systems use embeddings for even better results![/dim]"
+    ),
+    title="[bold white on cyan] KEY INSIGHT [/bold white on cyan]",
+    border_style="cyan",
+    box=box.DOUBLE
+)
+
+
+def show_key_insight():
+    """Show the key insight with coherent styling!"""
+    console.print("[bold cyan]>>> KEY INSIGHT[/bold cyan]")
+    console.print()
+
+    console.print(_KEY_INSIGHT_PANEL)
     console.print()
 
 
@@ -351,8 +452,19 @@ def show_footer():
     console.print()
 
 
-def main():
+def main(argv: Optional[List[str]] = None):
     """Run the SUPER COLORFUL semantic chunking demo!"""
+    parser = argparse.ArgumentParser(description="Semantic chunking demo")
+    parser.add_argument(
+        "--animate",
+        action="store_true",
+        help="pause briefly between sections, for live presentations"
+    )
+    args = parser.parse_args(argv)
+
+    def pause():
+        if args.animate:
+            time.sleep(0.3)
 
     # Sample document
     sample_document = """
@@ -374,29 +486,29 @@ def main():
     """
 
     show_header()
-    time.sleep(0.3)
+    pause()
 
     show_concept()
-    time.sleep(0.3)
+    pause()
 
     chunker = SemanticChunker(similarity_threshold=0.15)
     chunks = show_processing(sample_document, chunker)
-    time.sleep(0.3)
+    pause()
 
     show_chunk_tree(chunks)
-    time.sleep(0.3)
+    pause()
 
     show_comparison_table()
-    time.sleep(0.3)
+    pause()
 
     show_stats(chunks)
-    time.sleep(0.3)
+    pause()
 
     show_chunks_detailed(chunks)
-    time.sleep(0.3)
+    pause()
 
     show_key_insight()
-    time.sleep(0.3)
+    pause()
 
     show_footer()
 
@@ -138,6 +138,90 @@ class TestSemanticChunker:
 
         assert sim == 1.0
 
+    def test_bitmask_similarity_matches_word_sets(self):
+        """Test that the bitmask Jaccard agrees with plain set arithmetic"""
+        chunker = SemanticChunker()
+
+        sent1 = "Vector search finds similar vectors fast"
+        sent2 = "Keyword search finds exact words"
+        mask1, mask2 = chunker._token_masks([sent1, sent2])
+
+        words1 = set(sent1.lower().split())
+        words2 = set(sent2.lower().split())
+        expected = len(words1 & words2) / len(words1 | words2)
+
+        assert chunker._jaccard_bits(mask1, mask2) == expected
+        assert chunker._jaccard_bits(0, 0) == 0.0
+
+    def test_threshold_sweep_reuses_cached_analysis(self, monkeypatch):
+        """Test that re-chunking a document with a new threshold hits the cache"""
+        text = "Cats purr softly. Cats purr loudly. Stocks fell sharply today."
+        chunker = SemanticChunker(similarity_threshold=0.1)
+
+        calls = []
+        original = chunker._adjacent_similarities
+
+        def counting(token_masks):
+            calls.append(token_masks)
+            return original(token_masks)
+
+        monkeypatch.setattr(chunker, "_adjacent_similarities", counting)
+        chunker.chunk_document(text)
+        chunker.similarity_threshold = 0.9
+        chunks = chunker.chunk_document(text)
+
+        assert len(calls) == 1
+        assert len(chunks) == 3
+        assert chunks == SemanticChunker(0.9, cache=False).chunk_document(text)
+
+    def test_analysis_cache_is_per_chunker(self, monkeypatch):
+        """Test that a chunker never reuses another chunker's analysis"""
+        text = "Cats purr softly. Cats purr loudly. Stocks fell sharply today."
+        SemanticChunker(similarity_threshold=0.3).chunk_document(text)
+
+        # Stands in for a subclass scoring with its own embedding model
+        chunker = SemanticChunker(similarity_threshold=0.3)
+        monkeypatch.setattr(chunker, "_adjacent_similarities", lambda masks: [1.0] * (len(masks) - 1))
+
+        assert len(chunker.chunk_document(text)) == 1
+
+    def test_iter_chunks_streams_same_chunks(self):
+        """Test that iter_chunks yields lazily and matches chunk_document"""
+        chunker = SemanticChunker(similarity_threshold=0.3)
+        text = "Cats purr softly. Cats purr loudly. Stocks fell sharply today."
+
+        stream = chunker.iter_chunks(text)
+
+        assert not isinstance(stream, list)
+        assert list(stream) == chunker.chunk_document(text)
+        assert list(chunker.iter_chunks("")) == []
+
+    def test_progress_reports_every_stage_as_it_runs(self, monkeypatch):
+        """Test that each stage reports in order and always finishes at done == total"""
+        texts = ["", "This is a single sentence.",
+                 "Cats purr softly. Cats purr loudly. Stocks fell sharply today."]
+
+        for text in texts:
+            chunker = SemanticChunker(similarity_threshold=0.3)
+            events = []
+            original = chunker._adjacent_similarities
+
+            def scoring(token_masks):
+                events.append("scoring")
+                return original(token_masks)
+
+            monkeypatch.setattr(chunker, "_adjacent_similarities", scoring)
+            list(chunker.iter_chunks(text, lambda stage, done, total: events.append((stage, done, total))))
+
+            # Sentence splitting is reported before similarities are computed
+            assert events[:2] == [(0, 1, 1), "scoring"]
+
+            reports = [event for event in events if event != "scoring"]
+            assert [stage for stage, _, _ in reports] == sorted(stage for stage, _, _ in reports)
+            for stage in range(4):
+                last = [report for report in reports if report[0] == stage][-1]
+                assert last[1] == last[2] > 0
+
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -5,14 +5,17 @@ HyDE (Hypothetical Document Embeddings) - ULTRA COLORFUL VERSION!
 Watch as we generate fake answers to bridge the vocabulary gap! MAXIMUM VISUAL FLAIR!
 """
 
+import argparse
+import re
 import time
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 from dataclasses import dataclass
 
+import numpy as np
+
 from rich.console import Console
 from rich.panel import Panel
 from rich.table import Table
-from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn
 from rich.tree import Tree
 from rich.text import Text
 from rich import box
@@ -21,11 +24,201 @@ console = Console()
 
 
 @dataclass
-class SearchResult:
-    """A search result with score"""
-    doc_id: str
+class Document:
+    """A document in the knowledge base"""
+    id: str
+    title: str
     content: str
-    score: float
+
+
+# Embedding vocabulary: question words (how users ask) alongside document
+# words (how docs answer). One vector dimension per keyword.
+_KEYWORDS = (
+    "what", "questions", "faq", "chunking", "semantic", "splits",
+    "documents", "topic", "boundaries", "context", "embeddings",
+    "retrieval", "quality", "preprocessing",
+)
+_KW_INDEX = {keyword: i for i, keyword in enumerate(_KEYWORDS)}
+_WORD_RE = re.compile(r"[a-z]+")
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize along the last axis (zero vectors stay zero)"""
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+class MockLLM:
+    """Mock LLM for hypothesis generation"""
+
+    def generate_hypothesis(self, query: str) -> str:
+        """
+        Write a hypothetical answer to the query.
+
+        Engineering decision: The answer only has to sound like the docs -
+        declarative, in document vocabulary. In production, prompt an actual
+        LLM (see README).
+        """
+        query_lower = query.lower()
+
+        if "chunking" in query_lower:
+            return (
+                "Semantic chunking is a document preprocessing technique that splits "
+                "text at meaningful topic boundaries rather than arbitrary character limits. "
+                "It uses embeddings to identify where topics shift, preserving context and "
+                "improving retrieval quality by 15-28% compared to fixed-size chunking."
+            )
+
+        # Default: restate the question as a statement
+        subject = query.rstrip("?").strip()
+        return f"{subject} is explained in the documents, which describe its context and retrieval quality."
+
+
+class MockEmbedding:
+    """
+    Keyword-count embedding for demonstration.
+
+    Vectors are float32 NumPy arrays with one dimension per keyword, so a
+    batch of texts is a contiguous (N, D) matrix.
+    """
+
+    def embed(self, text: str) -> np.ndarray:
+        """Embed a single text"""
+        return self.embed_batch([text])[0]
+
+    def embed_batch(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed many texts into one (N, D) matrix.
+
+        Engineering decision: Tokenize each text once and look words up in the
+        keyword index, instead of scanning the text once per keyword.
+        """
+        matrix = np.zeros((len(texts), len(_KEYWORDS)), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in _WORD_RE.findall(text.lower()):
+                col = _KW_INDEX.get(word)
+                if col is not None:
+                    matrix[row, col] += 1.0
+
+        return np.minimum(matrix / 3.0, 1.0)
+
+
+class HyDERetriever:
+    """
+    Retrieval with hypothetical document embeddings.
+
+    Key insight: Search with what you expect to find - embed an answer-shaped
+    hypothesis instead of the question.
+    """
+
+    def __init__(self, documents: List[Document]):
+        self.documents = documents
+        self.llm = MockLLM()
+        self.embedding = MockEmbedding()
+
+        # Knowledge base embedded once as L2-normalized rows, so cosine
+        # similarity against every document is a single matrix product
+        self.doc_matrix = _normalize(self.embedding.embed_batch([doc.content for doc in documents]))
+
+    def retrieve_naive(self, query: str, top_k: int = 3) -> List[Tuple[Document, float]]:
+        """
+        Baseline: embed the question itself.
+
+        Questions and answers use different vocabulary, so this often
+        surfaces FAQ and meta pages instead of the actual docs.
+        """
+        return self._search(self.embedding.embed(query), top_k)
+
+    def retrieve_hyde(self, query: str, top_k: int = 3,
+                      hypothesis: Optional[str] = None) -> List[Tuple[Document, float]]:
+        """
+        HyDE: embed a hypothetical answer instead of the question.
+
+        Pass an already generated hypothesis to skip the LLM call.
+        """
+        if hypothesis is None:
+            hypothesis = self.llm.generate_hypothesis(query)
+        return self._search(self.embedding.embed(hypothesis), top_k)
+
+    def retrieve_hyde_batch(self, queries: List[str],
+                            top_k: int = 3) -> List[List[Tuple[Document, float]]]:
+        """
+        HyDE for many queries at once - e.g. an evaluation run.
+
+        Engineering decision: Embed all hypotheses into one (Q, D) matrix and
+        score them with a single (Q, D) @ (D, N) product, instead of one
+        matrix-vector product per query.
+        """
+        hypotheses = [self.llm.generate_hypothesis(query) for query in queries]
+        return self._search_batch(self.embedding.embed_batch(hypotheses), top_k)
+
+    def _search(self, query_vector: np.ndarray, top_k: int) -> List[Tuple[Document, float]]:
+        """Cosine top-k over the knowledge base"""
+        return self._search_batch(query_vector[np.newaxis, :], top_k)[0]
+
+    def _search_batch(self, query_matrix: np.ndarray,
+                      top_k: int) -> List[List[Tuple[Document, float]]]:
+        """Cosine top-k over the knowledge base for each row of query_matrix"""
+        scores = _normalize(query_matrix) @ self.doc_matrix.T  # (Q, N)
+
+        top_k = min(top_k, scores.shape[1])
+        if top_k <= 0:
+            return [[] for _ in range(len(scores))]
+
+        # Partition out each row's top k (O(N)), then sort only those k
+        top = np.argpartition(-scores, top_k - 1, axis=1)[:, :top_k]
+        order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+
+        return [
+            [(self.documents[i], float(row_scores[i])) for i in row]
+            for row, row_scores in zip(top, scores)
+        ]
+
+
+def create_sample_documents() -> List[Document]:
+    """Create sample knowledge base about chunking"""
+    return [
+        Document(
+            id="doc_1",
+            title="Semantic Chunking: Split documents at topic boundaries for better RAG",
+            content="Semantic chunking splits documents at topic boundaries instead of fixed "
+                    "character limits. Embeddings reveal where the topic shifts, so chunking "
+                    "keeps context together and retrieval quality goes up."
+        ),
+        Document(
+            id="doc_3",
+            title="How semantic chunking improves retrieval quality in production",
+            content="Semantic chunking improves retrieval quality in production. Keeping each "
+                    "topic in one chunk preserves context, lifting retrieval precision 15-28% "
+                    "over fixed-size chunking."
+        ),
+        Document(
+            id="doc_5",
+            title="FAQ: Common questions about chunking strategies",
+            content="FAQ: Common questions about chunking strategies. What is chunking? "
+                    "What chunk size should I use? Which chunking library is best?"
+        ),
+        Document(
+            id="doc_7",
+            title="Implementation guide: semantic chunking algorithms explained",
+            content="Semantic chunking algorithms embed every sentence, compare the embeddings "
+                    "of neighbours and split documents where similarity drops at topic boundaries, "
+                    "ready for retrieval."
+        ),
+        Document(
+            id="doc_8",
+            title="Guide to text preprocessing techniques",
+            content="Guide to text preprocessing techniques. What is tokenization, what is "
+                    "chunking, and what is normalization?"
+        ),
+        Document(
+            id="doc_12",
+            title="Chunking vs splitting: What's the difference?",
+            content="Chunking vs splitting: what's the difference? Readers often ask whether "
+                    "chunking and splitting mean the same thing."
+        ),
+    ]
 
 
 def show_header():
@@ -42,12 +235,8 @@ def show_header():
     console.print()
 
 
-def show_problem():
-    """Show the vocabulary gap problem!"""
-    console.print("[bold red]>>> THE VOCABULARY GAP PROBLEM[/bold red]")
-    console.print()
-
-    problem = Panel(
+_PROBLEM_PANEL = Panel(
+    Text.from_markup(
         "[bold cyan]USERS ASK QUESTIONS:[/bold cyan]\n"
         "[cyan]\"How do I authenticate?\"[/cyan]\n"
         "[cyan]\"What is semantic chunking?\"[/cyan]\n\n"
@@ -55,33 +244,45 @@ def show_problem():
         "[green]\"Authentication is performed by...\"[/green]\n"
         "[green]\"Semantic chunking splits documents...\"[/green]\n\n"
         "[bold white on red] LANGUAGE MISMATCH = POOR RETRIEVAL! [/bold white on red]\n\n"
-        "[dim]Questions vs Statements = Different embeddings = Bad matches[/dim]",
-        title="[bold white on red] PROBLEM [/bold white on red]",
-        border_style="red",
-        box=box.HEAVY
-    )
-    console.print(problem)
-    console.print()
+        "[dim]Questions vs Statements = Different embeddings = Bad matches[/dim]"
+    ),
+    title="[bold white on red] PROBLEM [/bold white on red]",
+    border_style="red",
+    box=box.HEAVY
+)
 
 
-def show_solution():
-    """Show the HyDE solution!"""
-    console.print("[bold green]>>> THE HYDE SOLUTION[/bold green]")
+def show_problem():
+    """Show the vocabulary gap problem!"""
+    console.print("[bold red]>>> THE VOCABULARY GAP PROBLEM[/bold red]")
     console.print()
 
-    solution = Panel(
+    console.print(_PROBLEM_PANEL)
+    console.print()
+
+
+_SOLUTION_PANEL = Panel(
+    Text.from_markup(
         "[bold cyan]STEP 1:[/bold cyan] Generate a [yellow]fake answer[/yellow] to the question\n"
         "[bold cyan]STEP 2:[/bold cyan] Embed the [yellow]hypothesis[/yellow] (not the question!)\n"
         "[bold cyan]STEP 3:[/bold cyan] Search using [green]hypothesis embedding[/green]\n"
         "[bold cyan]STEP 4:[/bold cyan] Find [green]actual docs[/green] that match!\n\n"
         "[bold white on green] DOCUMENTS MATCH DOCUMENTS! [/bold white on green]\n\n"
         "[bold green]Result:[/bold green] [bold cyan]+20-30% precision improvement![/bold cyan]\n"
-        "[dim](Even if the fake answer is wrong, the vocabulary matches!)[/dim]",
-        title="[bold white on green] SOLUTION [/bold white on green]",
-        border_style="green",
-        box=box.DOUBLE
-    )
-    console.print(solution)
+        "[dim](Even if the fake answer is wrong, the vocabulary matches!)[/dim]"
+    ),
+    title="[bold white on green] SOLUTION [/bold white on green]",
+    border_style="green",
+    box=box.DOUBLE
+)
+
+
+def show_solution():
+    """Show the HyDE solution!"""
+    console.print("[bold green]>>> THE HYDE SOLUTION[/bold green]")
+    console.print()
+
+    console.print(_SOLUTION_PANEL)
     console.print()
 
 
@@ -101,24 +302,18 @@ def show_query(query: str):
     console.print()
 
 
-def generate_hypothesis_animated(query: str) -> str:
+def generate_hypothesis_animated(llm: MockLLM, query: str, thinking_time: float = 1.0) -> str:
     """Generate hypothesis with animation!"""
     console.print("[bold yellow]>>> GENERATING HYPOTHESIS[/bold yellow]")
     console.print()
 
     with console.status("[bold yellow]LLM is thinking...", spinner="dots"):
-        time.sleep(1)
+        hypothesis = llm.generate_hypothesis(query)
+        time.sleep(thinking_time)
 
     console.print("[green][OK][/green] Hypothesis generated!")
     console.print()
 
-    hypothesis = (
-        "Semantic chunking is a document preprocessing technique that splits "
-        "text at meaningful topic boundaries rather than arbitrary character limits. "
-        "It uses embeddings to identify where topics shift, preserving context and "
-        "improving retrieval quality by 15-28% compared to fixed-size chunking."
-    )
-
     # Show hypothesis generation process
     console.print("[bold yellow]>>> HYPOTHESIS (Fake Answer)[/bold yellow]")
     console.print()
@@ -138,25 +333,13 @@ def generate_hypothesis_animated(query: str) -> str:
     return hypothesis
 
 
-def show_comparison_search(query: str, hypothesis: str):
+def show_comparison_search(query: str, hypothesis: str,
+                           naive_results: List[Tuple[Document, float]],
+                           hyde_results: List[Tuple[Document, float]]):
     """Show naive vs HyDE search side by side!"""
     console.print("[bold cyan]>>> RETRIEVAL COMPARISON[/bold cyan]")
     console.print()
 
-    # Naive results
-    naive_results = [
-        SearchResult("doc_5", "FAQ: Common questions about chunking strategies", 0.72),
-        SearchResult("doc_12", "Chunking vs splitting: What's the difference?", 0.68),
-        SearchResult("doc_8", "Guide to text preprocessing techniques", 0.65),
-    ]
-
-    # HyDE results
-    hyde_results = [
-        SearchResult("doc_1", "Semantic Chunking: Split documents at topic boundaries for better RAG", 0.89),
-        SearchResult("doc_3", "How semantic chunking improves retrieval quality in production", 0.84),
-        SearchResult("doc_7", "Implementation guide: semantic chunking algorithms explained", 0.81),
-    ]
-
     # Create comparison table
     table = Table(
         title="[bold blue]Search Results Comparison[/bold blue]",
@@ -170,24 +353,33 @@ def show_comparison_search(query: str, hypothesis: str):
     table.add_column("HyDE Search\n(Hypothesis Embedding)", style="white", width=35)
     table.add_column("Score", justify="center", style="green bold", width=7)
 
-    for i, (naive, hyde) in enumerate(zip(naive_results, hyde_results), 1):
+    for i, ((naive_doc, naive_score), (hyde_doc, hyde_score)) in enumerate(zip(naive_results, hyde_results), 1):
         table.add_row(
             f"{i}",
-            f"[white]{naive.content[:50]}...[/white]",
-            f"[yellow]{naive.score:.2f}[/yellow]",
-            f"[white]{hyde.content[:50]}...[/white]",
-            f"[bold green]{hyde.score:.2f}[/bold green]"
+            f"[white]{naive_doc.title[:50]}...[/white]",
+            f"[yellow]{naive_score:.2f}[/yellow]",
+            f"[white]{hyde_doc.title[:50]}...[/white]",
+            f"[bold green]{hyde_score:.2f}[/bold green]"
         )
 
     console.print(table)
     console.print()
 
     # Highlight the difference
+    naive_top = naive_results[0][1]
+    hyde_top = hyde_results[0][1]
+    improvement = (hyde_top - naive_top) / naive_top * 100 if naive_top else 0.0
+    if round(improvement) > 0:
+        change = f"{improvement:+.0f}% better!"
+    elif round(improvement) < 0:
+        change = f"{improvement:+.0f}% worse"
+    else:
+        change = "no change"
     highlight = Panel(
         "[bold red]Naive:[/bold red] Found [yellow]FAQ and meta pages[/yellow] (not the actual docs!)\n"
         "[bold green]HyDE:[/bold green] Found [green]ACTUAL DOCUMENTATION[/green] (exactly what we need!)\n\n"
-        "[bold white]Score Improvement:[/bold white] [yellow]0.72[/yellow] -> [bold green]0.89[/bold green] "
-        "[cyan](+24% better!)[/cyan]",
+        f"[bold white]Score Improvement:[/bold white] [yellow]{naive_top:.2f}[/yellow] -> [bold green]{hyde_top:.2f}[/bold green] "
+        f"[cyan]({change})[/cyan]",
         title="[bold white on cyan] IMPACT [/bold white on cyan]",
         border_style="cyan",
         box=box.DOUBLE
@@ -234,11 +426,8 @@ def show_workflow_tree():
     console.print()
 
 
-def show_metrics():
-    """Show performance metrics!"""
-    console.print("[bold cyan]>>> PERFORMANCE METRICS[/bold cyan]")
-    console.print()
-
+def _build_metrics_table() -> Table:
+    """Build the static naive vs HyDE metrics table"""
     metrics = Table(
         box=box.ROUNDED,
         border_style="green",
@@ -255,36 +444,41 @@ def show_metrics():
     metrics.add_row("Latency", "120ms", "420ms", "[yellow]+300ms[/yellow]")
     metrics.add_row("Cost/Query", "$0.0001", "$0.0005", "[yellow]+$0.0004[/yellow]")
 
-    console.print(metrics)
-    console.print()
+    return metrics
+
 
-    tradeoff = Panel(
+_METRICS_TABLE = _build_metrics_table()
+
+_TRADEOFF_PANEL = Panel(
+    Text.from_markup(
         "[bold yellow]TRADE-OFF:[/bold yellow]\n\n"
         "[green]+[/green] Better precision (+20-30%)\n"
         "[green]+[/green] Better vocabulary matching\n"
         "[green]+[/green] Finds actual docs (not meta-content)\n\n"
         "[yellow]-[/yellow] Extra latency (+300-500ms)\n"
         "[yellow]-[/yellow] Extra LLM cost (~$20-60/100K queries)\n\n"
-        "[bold white]Worth it?[/bold white] [bold green]YES[/bold green] for high-value queries!",
-        title="[yellow]Trade-off Analysis[/yellow]",
-        border_style="yellow",
-        box=box.ROUNDED
-    )
-    console.print(tradeoff)
+        "[bold white]Worth it?[/bold white] [bold green]YES[/bold green] for high-value queries!"
+    ),
+    title="[yellow]Trade-off Analysis[/yellow]",
+    border_style="yellow",
+    box=box.ROUNDED
+)
+
+
+def show_metrics():
+    """Show performance metrics!"""
+    console.print("[bold cyan]>>> PERFORMANCE METRICS[/bold cyan]")
     console.print()
 
+    console.print(_METRICS_TABLE)
+    console.print()
 
-def show_key_insight():
-    """Show the key insight!"""
-    console.print("[bold cyan]>>> KEY INSIGHT[/bold cyan]")
+    console.print(_TRADEOFF_PANEL)
     console.print()
 
-    insight_title = Text()
-    insight_title.append("*** ", style="bold cyan")
-    insight_title.append("THE MAGIC TRICK", style="bold white on cyan")
-    insight_title.append(" ***", style="bold cyan")
 
-    insight = Panel(
+_KEY_INSIGHT_PANEL = Panel(
+    Text.from_markup(
         "[bold cyan]Documents are similar to other documents[/bold cyan]\n\n"
         "By generating a [yellow]fake answer[/yellow], we search in\n"
         "[green]\"document space\"[/green] instead of [red]\"question space\"[/red]\n\n"
@@ -292,12 +486,24 @@ def show_key_insight():
         "  [green]+[/green] Uses document vocabulary\n"
         "  [green]+[/green] Matches document structure\n"
         "  [green]+[/green] Finds real documentation\n\n"
-        "[bold white on blue] VOCABULARY GAP: BRIDGED! [/bold white on blue]",
-        title=insight_title,
-        border_style="cyan",
-        box=box.DOUBLE
-    )
-    console.print(insight)
+        "[bold white on blue] VOCABULARY GAP: BRIDGED! [/bold white on blue]"
+    ),
+    title=Text.assemble(
+        ("*** ", "bold cyan"),
+        ("THE MAGIC TRICK", "bold white on cyan"),
+        (" ***", "bold cyan")
+    ),
+    border_style="cyan",
+    box=box.DOUBLE
+)
+
+
+def show_key_insight():
+    """Show the key insight!"""
+    console.print("[bold cyan]>>> KEY INSIGHT[/bold cyan]")
+    console.print()
+
+    console.print(_KEY_INSIGHT_PANEL)
     console.print()
 
 
@@ -314,37 +520,53 @@ def show_footer():
     console.print()
 
 
-def main():
+def main(argv: Optional[List[str]] = None):
     """Run the ULTRA COLORFUL HyDE demo!"""
+    parser = argparse.ArgumentParser(description="HyDE demo")
+    parser.add_argument(
+        "--animate",
+        action="store_true",
+        help="pause briefly between sections, for live presentations"
+    )
+    args = parser.parse_args(argv)
+
+    def pause():
+        if args.animate:
+            time.sleep(0.3)
 
     query = "What is semantic chunking?"
+    retriever = HyDERetriever(create_sample_documents())
 
     show_header()
-    time.sleep(0.3)
+    pause()
 
     show_problem()
-    time.sleep(0.3)
+    pause()
 
     show_solution()
-    time.sleep(0.3)
+    pause()
 
     show_query(query)
-    time.sleep(0.3)
+    pause()
 
-    hypothesis = generate_hypothesis_animated(query)
-    time.sleep(0.3)
+    hypothesis = generate_hypothesis_animated(
+        retriever.llm, query, thinking_time=1.0 if args.animate else 0.0
+    )
+    pause()
 
-    show_comparison_search(query, hypothesis)
-    time.sleep(0.3)
+    naive_results = retriever.retrieve_naive(query, top_k=3)
+    hyde_results = retriever.retrieve_hyde(query, top_k=3, hypothesis=hypothesis)
+    show_comparison_search(query, hypothesis, naive_results, hyde_results)
+    pause()
 
     show_workflow_tree()
-    time.sleep(0.3)
+    pause()
 
     show_metrics()
-    time.sleep(0.3)
+    pause()
 
     show_key_insight()
-    time.sleep(0.3)
+    pause()
 
     show_footer()
 
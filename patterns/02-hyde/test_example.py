@@ -0,0 +1,80 @@
+"""
+Tests for HyDE example
+
+Validates that HyDE retrieval finds the actual docs and that batched
+search agrees with per-query search and with a brute-force cosine ranking.
+"""
+
+import numpy as np
+from example import HyDERetriever, create_sample_documents
+
+
+def brute_force_scores(retriever, query_vector):
+    """Cosine similarity of query_vector against every document, one at a time"""
+    scores = []
+    for doc in retriever.documents:
+        doc_vector = retriever.embedding.embed(doc.content)
+        norms = np.linalg.norm(query_vector) * np.linalg.norm(doc_vector)
+        scores.append(float(np.dot(query_vector, doc_vector) / norms) if norms else 0.0)
+    return scores
+
+
+class TestHyDERetriever:
+    """Test suite for HyDERetriever"""
+
+    def test_hyde_finds_actual_docs(self):
+        """Test that the hypothesis retrieves documentation the question misses"""
+        retriever = HyDERetriever(create_sample_documents())
+        query = "What is semantic chunking?"
+
+        naive_ids = [doc.id for doc, _ in retriever.retrieve_naive(query)]
+        hyde_ids = [doc.id for doc, _ in retriever.retrieve_hyde(query)]
+
+        assert "doc_5" in naive_ids  # FAQ page
+        assert hyde_ids[0] == "doc_1"
+        assert "doc_5" not in hyde_ids
+
+    def test_search_batch_matches_brute_force(self):
+        """Test that _search_batch returns the top-k cosine scores, best first"""
+        retriever = HyDERetriever(create_sample_documents())
+        rng = np.random.default_rng(0)
+        query_matrix = rng.random((8, retriever.doc_matrix.shape[1]), dtype=np.float32)
+
+        for top_k in (1, 3, 6):
+            results = retriever._search_batch(query_matrix, top_k)
+
+            assert len(results) == len(query_matrix)
+            for query_vector, hits in zip(query_matrix, results):
+                expected = brute_force_scores(retriever, query_vector)
+                scores = [score for _, score in hits]
+                by_id = {doc.id: score for doc, score in zip(retriever.documents, expected)}
+
+                assert scores == sorted(scores, reverse=True)
+                assert np.allclose(scores, sorted(expected, reverse=True)[:top_k], atol=1e-6)
+                assert np.allclose(scores, [by_id[doc.id] for doc, _ in hits], atol=1e-6)
+
+    def test_retrieve_hyde_batch_matches_single_queries(self):
+        """Test that batched HyDE returns what per-query HyDE returns"""
+        retriever = HyDERetriever(create_sample_documents())
+        queries = ["What is semantic chunking?", "How do embeddings work?", "What is retrieval quality?"]
+
+        batch = retriever.retrieve_hyde_batch(queries, top_k=2)
+        single = [retriever.retrieve_hyde(query, top_k=2) for query in queries]
+
+        assert [[doc.id for doc, _ in hits] for hits in batch] == [[doc.id for doc, _ in hits] for hits in single]
+        assert np.allclose([[s for _, s in hits] for hits in batch], [[s for _, s in hits] for hits in single])
+
+    def test_top_k_bounds(self):
+        """Test top_k of zero and larger than the knowledge base"""
+        retriever = HyDERetriever(create_sample_documents())
+
+        assert retriever.retrieve_naive("What is chunking?", top_k=0) == []
+        assert len(retriever.retrieve_naive("What is chunking?", top_k=99)) == len(retriever.documents)
+        assert retriever.retrieve_hyde_batch([]) == []
+
+    def test_empty_knowledge_base(self):
+        """Test that searching no documents returns no results"""
+        retriever = HyDERetriever([])
+
+        assert retriever.retrieve_hyde("What is chunking?") == []
+        assert retriever.retrieve_hyde_batch(["What is chunking?"]) == [[]]
@@ -0,0 +1,102 @@
+"""
+Tests for metadata filtering example
+
+Validates that the indexed filter path returns exactly the documents a
+plain MetadataFilter.matches scan would.
+"""
+
+import random
+
+from example import Document, FilteredRetriever, MetadataFilter, create_sample_documents
+
+
+def make_documents():
+    """Sample docs plus docs with list-valued tags and missing fields"""
+    docs = create_sample_documents()
+    docs.append(Document(
+        id="doc7", title="Tagged guide", content="Python SDK guide.",
+        metadata={"version": "v3", "language": "python", "tags": ["sdk", "guide"]}
+    ))
+    docs.append(Document(
+        id="doc8", title="Untyped note", content="Database reference.",
+        metadata={"version": "v1", "tags": ["database"]}
+    ))
+    return docs
+
+
+def brute_force(docs, filters):
+    """Rows matching filters, by testing every document"""
+    return [row for row, doc in enumerate(docs) if MetadataFilter.matches(doc.metadata, filters)]
+
+
+class TestFilteredRetriever:
+    """Test suite for FilteredRetriever's indexed filtering"""
+
+    def test_matches_brute_force_on_random_filters(self):
+        """Test that _filter_rows agrees with a full matches() scan"""
+        docs = make_documents()
+        retriever = FilteredRetriever(docs)
+        rng = random.Random(0)
+
+        values = {}
+        for doc in docs:
+            for key, value in doc.metadata.items():
+                if key != "tags":
+                    values.setdefault(key, []).append(value)
+        values["missing"] = ["x"]
+
+        for _ in range(500):
+            filters = {}
+            for key in rng.sample(sorted(values), rng.randint(1, 3)):
+                pool = values[key]
+                kind = rng.choice(["eq", "in", "gte", "lte_ne", "range"])
+                if kind == "eq":
+                    filters[key] = rng.choice(pool)
+                elif kind == "in":
+                    filters[key] = {"$in": rng.sample(pool, rng.randint(1, len(pool)))}
+                elif kind == "gte":
+                    filters[key] = {"$gte": rng.choice(pool)}
+                elif kind == "lte_ne":
+                    filters[key] = {"$lte": rng.choice(pool), "$ne": rng.choice(pool)}
+                else:
+                    low, high = sorted((rng.choice(pool), rng.choice(pool)))
+                    filters[key] = {"$gte": low, "$lte": high}
+
+            assert retriever._filter_rows(filters) == brute_force(docs, filters), filters
+
+    def test_unhashable_metadata_values(self):
+        """Test that list-valued metadata is indexed around, not rejected"""
+        docs = make_documents()
+        retriever = FilteredRetriever(docs)
+
+        assert "tags" not in retriever.eq_index
+        for filters in ({"tags": ["sdk", "guide"]},
+                        {"tags": {"$ne": ["database"]}},
+                        {"tags": {"$in": [["database"], ["other"]]}},
+                        {"tags": ["database"], "version": "v1"}):
+            assert retriever._filter_rows(filters) == brute_force(docs, filters)
+
+    def test_condition_without_known_operator_requires_field(self):
+        """Test that an empty or unknown-operator condition only matches docs having the field"""
+        docs = make_documents()
+        retriever = FilteredRetriever(docs)
+
+        for filters in ({"type": {}}, {"type": {"$regex": "api"}}, {"tags": {}}):
+            expected = brute_force(docs, filters)
+            assert retriever._filter_rows(filters) == expected
+            assert len(expected) < len(docs)
+
+    def test_string_in_condition_uses_substring_semantics(self):
+        """Test that $in given a string behaves like matches() does"""
+        docs = make_documents()
+        retriever = FilteredRetriever(docs)
+
+        filters = {"version": {"$in": "v2v3"}}
+        assert retriever._filter_rows(filters) == brute_force(docs, filters)
+
+    def test_empty_corpus(self):
+        """Test that retrieval over no documents returns nothing rather than raising"""
+        retriever = FilteredRetriever([])
+
+        assert retriever.retrieve_unfiltered("python api") == []
+        assert retriever.retrieve_filtered("python api", {"version": "v3"}) == ([], [])
@@ -6,8 +6,11 @@ Demonstrates breaking complex queries into focused sub-questions for
 better retrieval coverage.
 """
 
+from functools import lru_cache
 from typing import List, Tuple, Set
 from dataclasses import dataclass
+
+import numpy as np
 from rich import box
 
 from rich.console import Console
@@ -19,7 +22,7 @@ from rich.text import Text
 console = Console()
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Document:
     """A document in the knowledge base"""
     id: str
@@ -27,6 +30,74 @@ class Document:
     content: str
 
 
+# Embedding vocabulary: one vector dimension per keyword
+_KEYWORDS = ("asyncio", "threading", "performance", "concurrency",
+             "parallel", "event", "loop", "cpu", "io", "blocking")
+
+
+@lru_cache(maxsize=4096)
+def _embed_keywords(text: str) -> np.ndarray:
+    """
+    Keyword-count embedding, memoized per text.
+
+    Engineering decision: The full query and its sub-questions are embedded
+    again on every retrieval, so repeat texts become a cache hit. Returned
+    read-only because every caller gets the same array.
+    """
+    # str.count per keyword, not one regex pass: "io" also occurs inside
+    # "asyncio", and each keyword must count every occurrence
+    text_lower = text.lower()
+    counts = np.array([text_lower.count(keyword) for keyword in _KEYWORDS], dtype=np.float32)
+    embedding = np.minimum(counts / 2.0, 1.0)
+    embedding.flags.writeable = False
+    return embedding
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize along the last axis (zero vectors stay zero)"""
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k best scores, highest first; equal scores stay in document order"""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+
+    # Per sub-question: the k best by O(N) partition, tie-broken by document order
+    kth = -np.partition(-scores, k - 1)[k - 1]
+    above = np.flatnonzero(scores > kth)
+    tied = np.flatnonzero(scores == kth)[:k - len(above)]
+    top = np.concatenate([above, tied])
+    return top[np.lexsort((top, -scores[top]))]
+
+
+# Canned decompositions, checked in order: (cue groups, sub-questions).
+# A rule applies when each of its groups has at least one cue in the query.
+_SUBJECT = "RAG systems"  # Stands in for subject extraction
+_DECOMPOSITION_RULES = (
+    # Pattern: "compare X vs Y"
+    ((("compare", " vs "), ("asyncio",), ("threading",)), (
+        "What is asyncio and how does it work?",
+        "What is threading and how does it work?",
+        "What are the key differences between asyncio and threading?",
+    )),
+    # Pattern: "benefits and drawbacks"
+    ((("benefit", "advantage"), ("drawback", "disadvantage")), (
+        f"What are the benefits of {_SUBJECT}?",
+        f"What are the drawbacks of {_SUBJECT}?",
+        f"When should you use {_SUBJECT}?",
+    )),
+    # Pattern: "how to... and..."
+    ((("how",), (" and ",)), (
+        "How do I set up the feature?",
+        "How do I use the feature?",
+        "What are common issues?",
+    )),
+)
+
+
 class MockLLM:
     """Mock LLM for query decomposition"""
 
@@ -39,32 +110,10 @@ class MockLLM:
         """
         query_lower = query.lower()
 
-        # Pattern: "compare X vs Y"
-        if "compare" in query_lower or " vs " in query_lower:
-            if "asyncio" in query_lower and "threading" in query_lower:
-                return [
-                    "What is asyncio and how does it work?",
-                    "What is threading and how does it work?",
-                    "What are the key differences between asyncio and threading?"
-                ]
-
-        # Pattern: "benefits and drawbacks"
-        if ("benefit" in query_lower or "advantage" in query_lower) and \
-           ("drawback" in query_lower or "disadvantage" in query_lower):
-            subject = "RAG systems"  # Extract subject
-            return [
-                f"What are the benefits of {subject}?",
-                f"What are the drawbacks of {subject}?",
-                f"When should you use {subject}?"
-            ]
-
-        # Pattern: "how to... and..."
-        if "how" in query_lower and " and " in query_lower:
-            return [
-                "How do I set up the feature?",
-                "How do I use the feature?",
-                "What are common issues?"
-            ]
+        # First rule whose every cue group has a cue in the query wins
+        for cue_groups, sub_questions in _DECOMPOSITION_RULES:
+            if all(any(cue in query_lower for cue in cues) for cues in cue_groups):
+                return list(sub_questions)
 
         # Default: split on "and"
         if " and " in query_lower:
@@ -79,28 +128,25 @@ class MockLLM:
 class SimpleEmbedding:
     """Simple keyword-based embedding"""
 
-    def embed(self, text: str) -> List[float]:
-        keywords = ["asyncio", "threading", "performance", "concurrency",
-                   "parallel", "event", "loop", "cpu", "io", "blocking"]
-
-        embedding = []
-        text_lower = text.lower()
-        for keyword in keywords:
-            count = text_lower.count(keyword)
-            embedding.append(min(count / 2.0, 1.0))
+    def embed(self, text: str) -> np.ndarray:
+        return _embed_keywords(text)
 
-        return embedding
+    def embed_batch(self, texts: List[str]) -> np.ndarray:
+        """Embed several texts as the rows of one (N, D) matrix"""
+        if not texts:
+            # np.stack rejects an empty list; no texts is still a (0, D) matrix
+            return np.zeros((0, len(_KEYWORDS)), dtype=np.float32)
+        return np.stack([self.embed(text) for text in texts])
 
-    def similarity(self, emb1: List[float], emb2: List[float]) -> float:
+    def similarity(self, emb1: np.ndarray, emb2: np.ndarray) -> float:
         """Cosine similarity"""
-        dot_product = sum(a * b for a, b in zip(emb1, emb2))
-        norm1 = sum(a * a for a in emb1) ** 0.5
-        norm2 = sum(b * b for b in emb2) ** 0.5
+        norm1 = np.linalg.norm(emb1)
+        norm2 = np.linalg.norm(emb2)
 
         if norm1 == 0 or norm2 == 0:
             return 0.0
 
-        return dot_product / (norm1 * norm2)
+        return float(np.dot(emb1, emb2) / (norm1 * norm2))
 
 
 class QueryDecompositionRetriever:
@@ -116,11 +162,9 @@ class QueryDecompositionRetriever:
         self.llm = MockLLM()
         self.embedding = SimpleEmbedding()
 
-        # Pre-compute embeddings
-        self.doc_embeddings = {
-            doc.id: self.embedding.embed(doc.content)
-            for doc in documents
-        }
+        # Pre-compute document embeddings as one (N, D) matrix of L2-normalized
+        # rows, so every sub-question is scored against every document in one matmul
+        self.doc_matrix = _normalize(self.embedding.embed_batch([doc.content for doc in documents]))
 
     def retrieve_single(self, query: str, top_k: int = 3) -> List[Tuple[Document, float]]:
         """
@@ -128,18 +172,13 @@ class QueryDecompositionRetriever:
 
         For complex queries, this often returns vague or incomplete results.
         """
-        query_embedding = self.embedding.embed(query)
+        scores = self._vector_scores([query])[0]
+        ranked = _top_k(scores, top_k)
+        return [(self.documents[i], float(scores[i])) for i in ranked]
 
-        results = []
-        for doc in self.documents:
-            doc_embedding = self.doc_embeddings[doc.id]
-            similarity = self.embedding.similarity(query_embedding, doc_embedding)
-            results.append((doc, similarity))
-
-        results.sort(key=lambda x: x[1], reverse=True)
-        return results[:top_k]
-
-    def retrieve_decomposed(self, query: str, top_k_per_question: int = 2) -> Tuple[List[str], dict, List[Document]]:
+    def retrieve_decomposed(
+        self, query: str, top_k_per_question: int = 2
+    ) -> Tuple[List[str], List[Tuple[str, List[Tuple[Document, float]]]], List[Document]]:
         """
         Query decomposition retrieval.
 
@@ -150,35 +189,32 @@ class QueryDecompositionRetriever:
         # Step 1: Decompose query
         sub_questions = self.llm.decompose_query(query)
 
-        # Step 2: Retrieve for each sub-question
-        sub_results = {}
-        all_docs = []
+        # Step 2: Retrieve for each sub-question, as (sub-question, results)
+        # pairs in order
+        sub_results: List[Tuple[str, List[Tuple[Document, float]]]] = []
 
-        for sub_q in sub_questions:
-            query_embedding = self.embedding.embed(sub_q)
+        # One (Q, N) score matrix for all sub-questions at once
+        scores = self._vector_scores(sub_questions)
 
-            results = []
-            for doc in self.documents:
-                doc_embedding = self.doc_embeddings[doc.id]
-                similarity = self.embedding.similarity(query_embedding, doc_embedding)
-                results.append((doc, similarity))
+        for sub_q, row in zip(sub_questions, scores):
+            ranked = _top_k(row, top_k_per_question)
+            top_results = [(self.documents[i], float(row[i])) for i in ranked]
 
-            results.sort(key=lambda x: x[1], reverse=True)
-            top_results = results[:top_k_per_question]
+            sub_results.append((sub_q, top_results))
 
-            sub_results[sub_q] = top_results
-            all_docs.extend([doc for doc, _ in top_results])
-
-        # Step 3: Deduplicate
-        seen_ids = set()
-        unique_docs = []
-        for doc in all_docs:
-            if doc.id not in seen_ids:
-                seen_ids.add(doc.id)
-                unique_docs.append(doc)
+        # Step 3: Deduplicate by id, keeping first-seen order (dicts preserve
+        # insertion order, so no separate seen-set is needed)
+        unique_docs = list({
+            doc.id: doc for _, results in sub_results for doc, _ in results
+        }.values())
 
         return sub_questions, sub_results, unique_docs
 
+    def _vector_scores(self, queries: List[str]) -> np.ndarray:
+        """Cosine similarity of each query (rows) against every document (columns)"""
+        # One matmul scores every sub-question against every document
+        return _normalize(self.embedding.embed_batch(queries)) @ self.doc_matrix.T
+
 
 def create_sample_documents() -> List[Document]:
     """Create sample knowledge base about concurrency"""
@@ -235,8 +271,28 @@ def create_sample_documents() -> List[Document]:
     ]
 
 
+_KEY_INSIGHT_PANEL = Panel(
+    Text.from_markup(
+        "[bold cyan]Query decomposition provides comprehensive coverage[/bold cyan]\n\n"
+        "[yellow]Single query:[/yellow] Broad, may miss specific aspects\n"
+        "[green]Decomposed:[/green] Focused retrieval for each aspect\n\n"
+        "[bold white]Result:[/bold white] [bold green]+35% coverage for complex queries![/bold green]\n\n"
+        "[dim]Production tip: Use LLM (GPT-4, Claude) for intelligent decomposition[/dim]"
+    ),
+    title=Text.assemble(
+        ("*** ", "bold cyan"),
+        ("FOCUSED QUESTIONS = COMPLETE ANSWERS", "bold white on cyan"),
+        (" ***", "bold cyan")
+    ),
+    border_style="cyan",
+    box=box.DOUBLE,
+    padding=(1, 2)
+)
+
+
 def visualize_results(query: str, single_results: List[Tuple[Document, float]],
-                     sub_questions: List[str], sub_results: dict,
+                     sub_questions: List[str],
+                     sub_results: List[Tuple[str, List[Tuple[Document, float]]]],
                      combined_docs: List[Document]):
     """Display comparison between single and decomposed retrieval"""
 
@@ -287,7 +343,7 @@ def visualize_results(query: str, single_results: List[Tuple[Document, float]],
     console.print()
     console.print("[bold green]>>> STAGE 2: Retrieval for Each Sub-Question[/bold green]")
 
-    for i, (sub_q, results) in enumerate(sub_results.items(), 1):
+    for i, (sub_q, results) in enumerate(sub_results, 1):
         console.print()
         console.print(f"[bold cyan]Sub-Question {i}:[/bold cyan] [white]{sub_q}[/white]")
 
@@ -314,22 +370,7 @@ def visualize_results(query: str, single_results: List[Tuple[Document, float]],
     console.print()
     console.print("[bold cyan]>>> KEY INSIGHT[/bold cyan]")
 
-    insight_title = Text()
-    insight_title.append("*** ", style="bold cyan")
-    insight_title.append("FOCUSED QUESTIONS = COMPLETE ANSWERS", style="bold white on cyan")
-    insight_title.append(" ***", style="bold cyan")
-
-    console.print(Panel(
-        "[bold cyan]Query decomposition provides comprehensive coverage[/bold cyan]\n\n"
-        "[yellow]Single query:[/yellow] Broad, may miss specific aspects\n"
-        "[green]Decomposed:[/green] Focused retrieval for each aspect\n\n"
-        "[bold white]Result:[/bold white] [bold green]+35% coverage for complex queries![/bold green]\n\n"
-        "[dim]Production tip: Use LLM (GPT-4, Claude) for intelligent decomposition[/dim]",
-        title=insight_title,
-        border_style="cyan",
-        box=box.DOUBLE,
-        padding=(1, 2)
-    ))
+    console.print(_KEY_INSIGHT_PANEL)
 
 
 def show_header():
@@ -346,9 +387,8 @@ def show_header():
     console.print()
 
 
-def show_concept():
-    """Explain the concept with coherent colors!"""
-    concept = Panel(
+_CONCEPT_PANEL = Panel(
+    Text.from_markup(
         "[bold red]THE PROBLEM:[/bold red]\n"
         "[red]Complex queries[/red] are too broad = [bold red]Incomplete coverage![/bold red]\n\n"
         "[bold green]THE SOLUTION:[/bold green]\n"
@@ -357,12 +397,17 @@ def show_concept():
         "  [cyan]1.[/cyan] Use LLM to break query into sub-questions\n"
         "  [cyan]2.[/cyan] Retrieve focused results for each sub-question\n"
         "  [cyan]3.[/cyan] Combine and deduplicate results\n"
-        "  [cyan]4.[/cyan] Profit! [bold green](+35% coverage for complex queries!)[/bold green]",
-        title="[bold white on blue] CONCEPT [/bold white on blue]",
-        border_style="blue",
-        box=box.DOUBLE
-    )
-    console.print(concept)
+        "  [cyan]4.[/cyan] Profit! [bold green](+35% coverage for complex queries!)[/bold green]"
+    ),
+    title="[bold white on blue] CONCEPT [/bold white on blue]",
+    border_style="blue",
+    box=box.DOUBLE
+)
+
+
+def show_concept():
+    """Explain the concept with coherent colors!"""
+    console.print(_CONCEPT_PANEL)
     console.print()
 
 